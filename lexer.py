@@ -1,235 +1,265 @@
-from enum import Enum
-from typing import Tuple
-
-
-class TokenType(Enum):
-    LeftParen = "LeftParen"
-    RightParen = "RightParen"
-    LeftBrace = "LeftBrace"
-    RightBrace = "RightBrace"
-    LeftBracket = "LeftBracket"
-    RightBracket = "RightBracket"
-    Plus = "Plus"
-    PlusEqual = "PlusEqual"
-    Minus = "Minus"
-    MinusEqual = "MinusEqual"
-    Star = "Star"
-    StarEqual = "StarEqual"
-    Slash = "Slash"
-    SlashEqual = "SlashEqual"
-    Carrot = "Carrot"
-    CarrotEqual = "CarrotEqual"
-    Equal = "Equal"
-    EqualEqual = "EqualEqual"
-    GreaterThan = "GreaterThan"
-    GreaterThanEqual = "GreaterThanEqual"
-    LessThan = "LessThan"
-    LessThanEqual = "LessThanEqual"
-    And = "And"
-    Or = "Or"
-    Not = "Not"
-    String = "String"
-    Int = "Int"
-    Float = "Float"
-    Identifier = "Identifier"
-    Var = "Var"
-    Const = "Const"
-    Function = "Function"
-    Class = "Class"
-    If = "If"
-    For = "For"
-    While = "While"
-    Return = "Return"
-    Colon = "Colon"
-    Semicolon = "Semicolon"
-    Comma = "Comma"
-    Illegal = "Illegal"
-    Eof = "Eof"
+from array import array
+from enum import Enum, IntEnum, auto
+from typing import Callable, Dict, List, Tuple
+
+
+class TokenType(IntEnum):
+    __str__ = Enum.__str__
+    __format__ = Enum.__format__
+
+    LeftParen = auto()
+    RightParen = auto()
+    LeftBrace = auto()
+    RightBrace = auto()
+    LeftBracket = auto()
+    RightBracket = auto()
+    Plus = auto()
+    PlusEqual = auto()
+    Minus = auto()
+    MinusEqual = auto()
+    Star = auto()
+    StarEqual = auto()
+    Slash = auto()
+    SlashEqual = auto()
+    Carrot = auto()
+    CarrotEqual = auto()
+    Equal = auto()
+    EqualEqual = auto()
+    GreaterThan = auto()
+    GreaterThanEqual = auto()
+    LessThan = auto()
+    LessThanEqual = auto()
+    And = auto()
+    Or = auto()
+    Not = auto()
+    String = auto()
+    Int = auto()
+    Float = auto()
+    Identifier = auto()
+    Var = auto()
+    Const = auto()
+    Function = auto()
+    Class = auto()
+    If = auto()
+    For = auto()
+    While = auto()
+    Return = auto()
+    Colon = auto()
+    Semicolon = auto()
+    Comma = auto()
+    Illegal = auto()
+    Eof = auto()
+
+
+KEYWORDS = {
+    "and": TokenType.And,
+    "or": TokenType.Or,
+    "not": TokenType.Not,
+    "if": TokenType.If,
+    "var": TokenType.Var,
+    "const": TokenType.Const,
+    "function": TokenType.Function,
+    "class": TokenType.Class,
+    "for": TokenType.For,
+    "while": TokenType.While,
+    "return": TokenType.Return,
+}
+
+SINGLE_TYPES = {ord(ch): type for ch, type in (
+    ('(', TokenType.LeftParen), (')', TokenType.RightParen),
+    ('[', TokenType.LeftBrace), (']', TokenType.RightBrace),
+    ('{', TokenType.LeftBracket), ('}', TokenType.RightBracket),
+    (':', TokenType.Colon), (';', TokenType.Semicolon),
+    (',', TokenType.Comma),
+)}
+
+OPERATOR_TYPES = {ord(ch): (type, equal_type) for ch, type, equal_type in (
+    ('=', TokenType.Equal, TokenType.EqualEqual),
+    ('>', TokenType.GreaterThan, TokenType.GreaterThanEqual),
+    ('<', TokenType.LessThan, TokenType.LessThanEqual),
+    ('+', TokenType.Plus, TokenType.PlusEqual),
+    ('-', TokenType.Minus, TokenType.MinusEqual),
+    ('*', TokenType.Star, TokenType.StarEqual),
+    ('/', TokenType.Slash, TokenType.SlashEqual),
+    ('^', TokenType.Carrot, TokenType.CarrotEqual),
+)}
+
+DIGIT = bytes(1 if 0x30 <= i <= 0x39 else 0 for i in range(256))
+IDENT = bytes(1 if 0x30 <= i <= 0x39 or 0x41 <= i <= 0x5A or 0x61 <= i <= 0x7A or i == 0x5F else 0
+              for i in range(256))
+_DOT, _EQUAL, _ZERO = ord('.'), ord('='), ord('0')
 
 
 class Token:
-    def __init__(self, type: TokenType, lexeme: str) -> None:
+    __slots__ = ("type", "lexeme", "value")
+
+    def __init__(self, type: TokenType, lexeme: str, value: int | float | None = None) -> None:
         self.type = type
         self.lexeme = lexeme
+        self.value = value
 
     def __str__(self) -> str:
         return f"Token(type: {self.type}, lexeme: '{self.lexeme}')"
 
 
+_TT_STRING, _TT_INT, _TT_FLOAT, _TT_IDENTIFIER, _TT_ILLEGAL, _TT_EOF = (
+    TokenType.String, TokenType.Int, TokenType.Float, TokenType.Identifier, TokenType.Illegal, TokenType.Eof)
+
+
 class Lexer:
+    _EOF = Token(_TT_EOF, "Eof")
+
     def __init__(self, source: str) -> None:
         self.source = source
+        self.buffer = source.encode("ascii", "replace") + b"\0"
+        self.length = len(source)
         self.curr_index = 0
-        self.row = 0
-        self.col = 0
-
-    def curr(self) -> str:
-        return self.source[self.curr_index]
+        self.start = 0
+        self.end = 0
+        self.value: int | float = 0
 
-    def advance(self):
+    def advance(self) -> None:
         self.curr_index += 1
-        self.col += 1
 
     def is_at_end(self) -> bool:
-        return self.curr_index >= len(self.source)
+        return self.curr_index >= self.length
+
+    def scan(self) -> TokenType:
+        buffer, dispatch = self.buffer, _DISPATCH
+
+        while True:
+            type = dispatch[buffer[self.curr_index]](self)
+            if type is not None:
+                return type
 
     def next(self) -> Token:
+        type = self.scan()
+        if type is _TT_EOF:
+            return self._EOF
+        if type is _TT_INT or type is _TT_FLOAT:
+            return Token(type, self.source[self.start:self.end], self.value)
+        return Token(type, self.source[self.start:self.end])
+
+    def tokenize_all(self) -> Tuple[List[TokenType], array, array, Dict[int, int | float]]:
+        types: List[TokenType] = []
+        starts, lengths = array('i'), array('i')
+        values: Dict[int, int | float] = {}
+
+        while True:
+            type = self.scan()
+            if type is _TT_INT or type is _TT_FLOAT:
+                values[len(types)] = self.value
+            types.append(type)
+            starts.append(self.start)
+            lengths.append(self.end - self.start)
+            if type is _TT_EOF:
+                return types, starts, lengths, values
+
+    def a_single(self) -> TokenType:
+        index = self.curr_index
+        self.start, self.end = index, index + 1
+        self.curr_index = index + 1
+        return SINGLE_TYPES[self.buffer[index]]
+
+    def an_operator(self) -> TokenType:
+        buffer, start = self.buffer, self.curr_index
+        if buffer[start + 1] == _EQUAL:
+            self.start, self.end = start, start + 2
+            self.curr_index = start + 2
+            return OPERATOR_TYPES[buffer[start]][1]
+        self.start, self.end = start, start + 1
+        self.curr_index = start + 1
+        return OPERATOR_TYPES[buffer[start]][0]
+
+    def an_identifier_token(self) -> TokenType:
+        start = self.curr_index
+        identifier = self.an_identifier()
+        self.start, self.end = start, self.curr_index
+        return KEYWORDS.get(identifier, _TT_IDENTIFIER)
+
+    def a_whitespace(self) -> None:
+        self.curr_index += 1
+
+    def a_nul(self) -> TokenType:
         if self.is_at_end():
-            return Token(TokenType.Eof, "Eof")
-
-        match self.curr():
-            case '(':
-                self.advance()
-                return Token(TokenType.LeftParen, "(")
-            case ')':
-                self.advance()
-                return Token(TokenType.RightParen, ")")
-            case '[':
-                self.advance()
-                return Token(TokenType.LeftBrace, "[")
-            case ']':
-                self.advance()
-                return Token(TokenType.RightBrace, "]")
-            case '{':
-                self.advance()
-                return Token(TokenType.LeftBracket, "{")
-            case '}':
-                self.advance()
-                return Token(TokenType.RightBracket, "}")
-            case '=':
-                self.advance()
-                if self.curr() == '=':
-                    self.advance()
-                    return Token(TokenType.EqualEqual, "==")
-                return Token(TokenType.Equal, "=")
-            case '>':
-                self.advance()
-                if self.curr() == '=':
-                    self.advance()
-                    return Token(TokenType.GreaterThanEqual, ">=")
-                return Token(TokenType.GreaterThan, ">")
-            case '<':
-                self.advance()
-                if self.curr() == '=':
-                    self.advance()
-                    return Token(TokenType.LessThanEqual, "<=")
-                return Token(TokenType.LessThan, "<")
-            case '+':
-                self.advance()
-                if self.curr() == '=':
-                    self.advance()
-                    return Token(TokenType.PlusEqual, "+=")
-                return Token(TokenType.Plus, "+")
-            case '-':
-                self.advance()
-                if self.curr() == '=':
-                    self.advance()
-                    return Token(TokenType.MinusEqual, "-=")
-                return Token(TokenType.Minus, "-")
-            case '*':
-                self.advance()
-                if self.curr() == '=':
-                    self.advance()
-                    return Token(TokenType.StarEqual, "*=")
-                return Token(TokenType.Star, "*")
-            case '/':
-                self.advance()
-                if self.curr() == '=':
-                    self.advance()
-                    return Token(TokenType.SlashEqual, "/=")
-                return Token(TokenType.Slash, "/")
-            case '^':
-                self.advance()
-                if self.curr() == '=':
-                    self.advance()
-                    return Token(TokenType.CarrotEqual, "^=")
-                return Token(TokenType.Carrot, "^")
-            case '"':
-                result = self.a_string()
-                return Token(TokenType.String, result)
-            case i if i.isnumeric():
-                result, is_float = self.a_number()
-                if is_float:
-                    return Token(TokenType.Float, result)
-                return Token(TokenType.Int, result)
-            case ':':
-                self.advance()
-                return Token(TokenType.Colon, ":")
-            case ';':
-                self.advance()
-                return Token(TokenType.Semicolon, ";")
-            case '\n':
-                self.advance()
-                self.col = 0
-                self.row += 1
-                return self.next()
-            case ',':
-                self.advance()
-                return Token(TokenType.Comma, ",")
-            case ' ':
-                self.advance()
-                return self.next()
-            case a if a.isalpha():
-                identifier = self.an_identifier()
-                match identifier:
-                    case "and": return Token(TokenType.And, identifier)
-                    case "or": return Token(TokenType.Or, identifier)
-                    case "if": return Token(TokenType.If, identifier)
-                    case "var": return Token(TokenType.Var, identifier)
-                    case "const": return Token(TokenType.Const, identifier)
-                    case "function": return Token(TokenType.Function, identifier)
-                    case "class": return Token(TokenType.Class, identifier)
-                    case "for": return Token(TokenType.For, identifier)
-                    case "while": return Token(TokenType.While, identifier)
-                    case "return": return Token(TokenType.Return, identifier)
-                    case _:
-                        return Token(TokenType.Identifier, identifier)
-            case _:
-                illegal = self.curr()
-                self.advance()
-                return Token(TokenType.Illegal, illegal)
-
-    def a_string(self) -> str:
-        self.advance()
-        result = ""
-
-        while not self.is_at_end():
-            if self.curr() == '"':
-                break
+            self.start = self.end = self.curr_index
+            return _TT_EOF
+        return self.an_illegal()
 
-            result += self.curr()
-            self.advance()
+    def an_illegal(self) -> TokenType:
+        index = self.curr_index
+        self.start, self.end = index, index + 1
+        self.curr_index = index + 1
+        return _TT_ILLEGAL
 
-        self.advance()
+    def a_string(self) -> TokenType:
+        start = self.curr_index + 1
+        end = self.source.find('"', start)
+        if end == -1:
+            end = self.length
 
-        return result
+        self.start, self.end = start, end
+        self.curr_index = min(end + 1, self.length)
 
-    def a_number(self) -> Tuple[str, bool]:
-        result, is_float = "", False
+        return _TT_STRING
 
-        while not self.is_at_end():
-            if self.curr() == '.':
-                is_float = True
-                result += self.curr()
-                self.advance()
-                continue
+    def a_number(self) -> TokenType:
+        buffer, index, is_float = self.buffer, self.curr_index, False
 
-            if not self.curr().isnumeric():
+        while True:
+            if buffer[index] == _DOT and not is_float:
+                is_float = True
+            elif not DIGIT[buffer[index]]:
                 break
 
-            result += self.curr()
-            self.advance()
+            index += 1
+
+        start = self.curr_index
+        self.start, self.end = start, index
+        self.curr_index = index
 
-        return result, is_float
+        if is_float:
+            self.value = float(self.source[start:index])
+            return _TT_FLOAT
+        if index - start == 1:
+            self.value = buffer[start] - _ZERO
+        else:
+            self.value = int(self.source[start:index])
+        return _TT_INT
 
     def an_identifier(self) -> str:
-        result = ""
+        buffer, start = self.buffer, self.curr_index
+        index = start
 
-        while not self.is_at_end():
-            if not self.curr().isalnum():
-                break
+        while IDENT[buffer[index]]:
+            index += 1
+
+        self.curr_index = index
+
+        return self.source[start:index]
+
+
+def build_dispatch() -> List[Callable[[Lexer], TokenType | None]]:
+    dispatch: List[Callable[[Lexer], TokenType | None]] = [Lexer.an_illegal] * 128
+
+    for code in SINGLE_TYPES:
+        dispatch[code] = Lexer.a_single
+
+    for code in OPERATOR_TYPES:
+        dispatch[code] = Lexer.an_operator
+
+    for code in range(ord('0'), ord('9') + 1):
+        dispatch[code] = Lexer.a_number
+
+    for code in (*range(ord('A'), ord('Z') + 1), *range(ord('a'), ord('z') + 1), ord('_')):
+        dispatch[code] = Lexer.an_identifier_token
+
+    dispatch[ord('"')] = Lexer.a_string
+    dispatch[ord('\n')] = Lexer.a_whitespace
+    dispatch[ord(' ')] = Lexer.a_whitespace
+    dispatch[0] = Lexer.a_nul
+
+    return dispatch
 
-            result += self.curr()
-            self.advance()
 
-        return result
+_DISPATCH = build_dispatch()
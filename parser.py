@@ -1,6 +1,7 @@
 from __future__ import annotations
-from enum import Enum
-from typing import List
+from io import StringIO
+from typing import Callable, Dict, List, NamedTuple, NoReturn, Tuple, Type
+import sys
 from lexer import Lexer, TokenType
 
 
@@ -9,302 +10,483 @@ class UnexpectedToken(Exception):
 
 
 class IntExpr:
+    __slots__ = ("val", "text")
+
     def __init__(self, val: int) -> None:
         self.val = val
+        self.text: str | None = None
 
     def __str__(self) -> str:
-        return f"IntExpr(val: {self.val})"
+        return to_string(self)
 
 
 class StringExpr:
+    __slots__ = ("val", "text")
+
     def __init__(self, val: str) -> None:
         self.val = val
+        self.text: str | None = None
 
     def __str__(self) -> str:
-        return f"StringExpr(val: '{self.val}')"
+        return to_string(self)
 
 
 class FloatExpr:
+    __slots__ = ("val", "text")
+
     def __init__(self, val: float) -> None:
         self.val = val
+        self.text: str | None = None
 
     def __str__(self) -> str:
-        return f"FloatExpr(val: {self.val})"
+        return to_string(self)
 
 
 class IdentifierExpr:
+    __slots__ = ("val", "type", "text")
+
     def __init__(self, val: str, type: str | None = None) -> None:
         self.val = val
         self.type = type
+        self.text: str | None = None
 
     def __str__(self) -> str:
-        return f"IdentifierExpr(val: '{self.val}', type: {self.type})"
+        return to_string(self)
 
 
 class BinaryExpr:
+    __slots__ = ("lhs", "op", "rhs")
+
     def __init__(self, lhs: Expression, op: str, rhs: Expression) -> None:
         self.lhs = lhs
         self.op = op
         self.rhs = rhs
 
     def __str__(self) -> str:
-        return f"BinaryExpr(lhs: {self.lhs}, op: {self.op}, rhs: {self.rhs})"
+        return to_string(self)
 
 
 class BlockExpr:
+    __slots__ = ("exprs",)
+
     def __init__(self, exprs: List[Expression]) -> None:
         self.exprs = exprs
 
     def __str__(self) -> str:
-        exprs = [str(expr) for expr in self.exprs]
-        return f"BlockExpr(exprs: {exprs})"
+        return to_string(self)
 
 
 class VarExpr:
+    __slots__ = ("lhs", "rhs")
+
     def __init__(self, lhs: Expression, rhs: Expression) -> None:
         self.lhs = lhs
         self.rhs = rhs
 
     def __str__(self) -> str:
-        return f"VarExpr(lhs: {self.lhs}, rhs: {self.rhs})"
+        return to_string(self)
 
 
 class ConstExpr:
+    __slots__ = ("lhs", "rhs")
+
     def __init__(self, lhs: Expression, rhs: Expression) -> None:
         self.lhs = lhs
         self.rhs = rhs
 
     def __str__(self) -> str:
-        return f"ConstExpr(lhs: {self.lhs}, rhs: {self.rhs})"
+        return to_string(self)
 
 
 class FunctionExpr:
+    __slots__ = ("identifier", "params", "body")
+
     def __init__(self, identifier: Expression, params: List[Expression], body: Expression) -> None:
         self.identifier = identifier
         self.params = params
         self.body = body
 
     def __str__(self) -> str:
-        params = [str(param) for param in self.params]
-        return f"FunctionExpr(identifier: {self.identifier}, params: {params}, body: {self.body})"
+        return to_string(self)
 
 
 class ReturnExpr:
+    __slots__ = ("expr",)
+
     def __init__(self, expr: Expression) -> None:
         self.expr = expr
 
     def __str__(self) -> str:
-        return f"ReturnExpr(expr: {self.expr})"
+        return to_string(self)
 
 
-class Associativity(Enum):
-    Left = "Left"
-    Right = "Right"
+LEFT, RIGHT = 0, 1
 
 
-class Operator:
-    def __init__(self, op: str, precedence: int, associativity: Associativity) -> None:
-        self.op = op
-        self.precedence = precedence
-        self.associativity = associativity
+class Operator(NamedTuple):
+    op: str
+    precedence: int
+    assoc_bump: int
 
     def __str__(self) -> str:
-        return f"Operator(op: {self.op}, precedence: {self.precedence}, associativity: {self.associativity})"
+        return f"Operator(op: {self.op}, precedence: {self.precedence}, assoc_bump: {self.assoc_bump})"
 
 
 ALLOWED_OPS = {
-    "or":  Operator("or", 0, Associativity.Left),
-    "and": Operator("and", 0, Associativity.Left),
-    "not": Operator("not", 0, Associativity.Left),
-
-    "==":  Operator("==", 0, Associativity.Left),
-    "<":   Operator("<", 1, Associativity.Left),
-    "<=":  Operator("<=", 1, Associativity.Left),
-    ">":   Operator(">", 1, Associativity.Left),
-    ">=":  Operator(">", 1, Associativity.Left),
-
-    "+":   Operator("+", 6, Associativity.Left),
-    "-":   Operator("-", 6, Associativity.Left),
-    "*":   Operator("*", 7, Associativity.Left),
-    "/":   Operator("/", 7, Associativity.Left),
-    "^":   Operator("^", 8, Associativity.Right),
+    "or":  Operator("or", 0, LEFT),
+    "and": Operator("and", 0, LEFT),
+    "not": Operator("not", 0, LEFT),
+
+    "==":  Operator("==", 0, LEFT),
+    "<":   Operator("<", 1, LEFT),
+    "<=":  Operator("<=", 1, LEFT),
+    ">":   Operator(">", 1, LEFT),
+    ">=":  Operator(">=", 1, LEFT),
+
+    "+":   Operator("+", 6, LEFT),
+    "-":   Operator("-", 6, LEFT),
+    "*":   Operator("*", 7, LEFT),
+    "/":   Operator("/", 7, LEFT),
+    "^":   Operator("^", 8, RIGHT),
 }
 
+OPERATORS = {type: (sys.intern(op), ALLOWED_OPS[op].precedence, ALLOWED_OPS[op].assoc_bump) for type, op in (
+    (TokenType.Or, "or"), (TokenType.And, "and"), (TokenType.Not, "not"),
+    (TokenType.EqualEqual, "=="), (TokenType.LessThan, "<"), (TokenType.LessThanEqual, "<="),
+    (TokenType.GreaterThan, ">"), (TokenType.GreaterThanEqual, ">="),
+    (TokenType.Plus, "+"), (TokenType.Minus, "-"), (TokenType.Star, "*"), (TokenType.Slash, "/"),
+    (TokenType.Carrot, "^"),
+)}
+
 PrimaryExpr = IntExpr | StringExpr | FloatExpr | IdentifierExpr
 Expression = PrimaryExpr | BinaryExpr | BlockExpr | VarExpr | ConstExpr | FunctionExpr | ReturnExpr
 
 
+def to_string(node: Expression) -> str:
+    out = StringIO()
+    render(node, out)
+    return out.getvalue()
+
+
+def render(node: Expression, out: StringIO) -> None:
+    RENDERERS[type(node)](node, out)
+
+
+def render_list(nodes: List[Expression], out: StringIO) -> None:
+    out.write("[")
+    for i, node in enumerate(nodes):
+        if i:
+            out.write(", ")
+        render(node, out)
+    out.write("]")
+
+
+def render_int(node: IntExpr, out: StringIO) -> None:
+    if node.text is None:
+        node.text = f"IntExpr(val: {node.val})"
+    out.write(node.text)
+
+
+def render_string(node: StringExpr, out: StringIO) -> None:
+    if node.text is None:
+        node.text = f"StringExpr(val: '{node.val}')"
+    out.write(node.text)
+
+
+def render_float(node: FloatExpr, out: StringIO) -> None:
+    if node.text is None:
+        node.text = f"FloatExpr(val: {node.val})"
+    out.write(node.text)
+
+
+def render_identifier(node: IdentifierExpr, out: StringIO) -> None:
+    if node.text is None:
+        node.text = f"IdentifierExpr(val: '{node.val}', type: {node.type})"
+    out.write(node.text)
+
+
+def render_binary(node: BinaryExpr, out: StringIO) -> None:
+    out.write("BinaryExpr(lhs: ")
+    render(node.lhs, out)
+    out.write(f", op: {node.op}, rhs: ")
+    render(node.rhs, out)
+    out.write(")")
+
+
+def render_block(node: BlockExpr, out: StringIO) -> None:
+    out.write("BlockExpr(exprs: ")
+    render_list(node.exprs, out)
+    out.write(")")
+
+
+def render_var(node: VarExpr, out: StringIO) -> None:
+    out.write("VarExpr(lhs: ")
+    render(node.lhs, out)
+    out.write(", rhs: ")
+    render(node.rhs, out)
+    out.write(")")
+
+
+def render_const(node: ConstExpr, out: StringIO) -> None:
+    out.write("ConstExpr(lhs: ")
+    render(node.lhs, out)
+    out.write(", rhs: ")
+    render(node.rhs, out)
+    out.write(")")
+
+
+def render_function(node: FunctionExpr, out: StringIO) -> None:
+    out.write("FunctionExpr(identifier: ")
+    render(node.identifier, out)
+    out.write(", params: ")
+    render_list(node.params, out)
+    out.write(", body: ")
+    render(node.body, out)
+    out.write(")")
+
+
+def render_return(node: ReturnExpr, out: StringIO) -> None:
+    out.write("ReturnExpr(expr: ")
+    render(node.expr, out)
+    out.write(")")
+
+
+RENDERERS: Dict[type, Callable[..., None]] = {
+    IntExpr: render_int,
+    StringExpr: render_string,
+    FloatExpr: render_float,
+    IdentifierExpr: render_identifier,
+    BinaryExpr: render_binary,
+    BlockExpr: render_block,
+    VarExpr: render_var,
+    ConstExpr: render_const,
+    FunctionExpr: render_function,
+    ReturnExpr: render_return,
+}
+
+_T_Int = TokenType.Int
+_T_Float = TokenType.Float
+_T_String = TokenType.String
+_T_Identifier = TokenType.Identifier
+_T_Var = TokenType.Var
+_T_Const = TokenType.Const
+_T_Function = TokenType.Function
+_T_Return = TokenType.Return
+_T_Equal = TokenType.Equal
+_T_Colon = TokenType.Colon
+_T_Semicolon = TokenType.Semicolon
+_T_Comma = TokenType.Comma
+_T_LeftParen = TokenType.LeftParen
+_T_RightParen = TokenType.RightParen
+_T_LeftBracket = TokenType.LeftBracket
+_T_RightBracket = TokenType.RightBracket
+_T_Eof = TokenType.Eof
+
+
 class Parser:
     def __init__(self, lexer: Lexer) -> None:
         self.lexer = lexer
-        self.curr_token = self.lexer.next()
-        self.prev_token = self.curr_token
-        self.parsed_trees: List[Expression] = []
+        self.source = lexer.source
+        self.types, self.starts, self.lengths, self.values = lexer.tokenize_all()
+        self.pos = 0
+        self.parsed_trees: List[Expression] | None = None
+        # Within one parse, every use of the same int literal or name shares one
+        # leaf, so nothing may mutate a leaf after construction. The only write
+        # allowed is the render_* cache of node.text, identical for every sharer.
+        self.ints: Dict[int, IntExpr] = {}
+        self.identifiers: Dict[Tuple[str, str | None], IdentifierExpr] = {}
+
+    def lexeme(self, pos: int) -> str:
+        if self.types[pos] is _T_Eof:
+            return "Eof"
+        start = self.starts[pos]
+        return self.source[start:start + self.lengths[pos]]
 
     def advance(self) -> None:
-        self.prev_token = self.curr_token
-        self.curr_token = self.lexer.next()
+        self.pos += 1
 
     def is_at_end(self) -> bool:
-        return self.curr_token.type == TokenType.Eof
+        return self.types[self.pos] is _T_Eof
 
-    def match(self, *types: TokenType) -> bool:
-        for type in types:
-            if self.curr_token.type == type:
-                self.advance()
-                return True
+    def match_one(self, type: TokenType) -> bool:
+        pos = self.pos
+        if self.types[pos] is type:
+            self.pos = pos + 1
+            return True
         return False
 
     def peek(self, type: TokenType) -> bool:
-        return self.curr_token.type == type
+        return self.types[self.pos] is type
 
     def parse(self) -> List[Expression]:
-        if self.is_at_end():
-            return self.parsed_trees
+        if self.parsed_trees is None:
+            self.parsed_trees = []
 
-        expr = self.parse_expr()
-        self.parsed_trees.append(expr)
-
-        return self.parse()
+        trees, parse_expr, is_at_end = self.parsed_trees, self.parse_expr, self.is_at_end
+        while not is_at_end():
+            trees.append(parse_expr())
 
-    def parse_expr(self, min_precedence=0) -> Expression:
-        lhs = self.parse_primary()
+        return trees
 
-        while not self.is_at_end():
-            op = self.curr_token.lexeme
-            op_is_allowed = op in ALLOWED_OPS
+    def parse_expr(self, min_precedence: int = 0, _Binary: Type[BinaryExpr] = BinaryExpr) -> Expression:
+        types = self.types
+        parse = PRIMARY_PARSERS.get(types[self.pos])
+        if parse is None:
+            self.unexpected_token()
+        lhs = parse(self)
 
-            if not op_is_allowed or ALLOWED_OPS[op].precedence < min_precedence:
+        while True:
+            info = OPERATORS.get(types[self.pos])
+            if info is None:
                 break
 
-            curr_op = ALLOWED_OPS[op]
-            next_min_precedence = curr_op.precedence
-
-            if curr_op.associativity == Associativity.Right:
-                next_min_precedence += 1
+            op, precedence, assoc_bump = info
+            if precedence < min_precedence:
+                break
 
-            self.advance()
-            rhs = self.parse_expr(next_min_precedence)
-            lhs = BinaryExpr(lhs, op, rhs)
+            self.pos += 1
+            rhs = self.parse_expr(precedence + assoc_bump)
+            lhs = _Binary(lhs, op, rhs)
 
         return lhs
 
-    def parse_primary(self) -> Expression:
-        return self.parse_int()
-
     def parse_int(self) -> Expression:
-        if self.match(TokenType.Int):
-            return IntExpr(int(self.prev_token.lexeme))
-
-        return self.parse_float()
+        pos = self.pos
+        self.pos = pos + 1
+        val = self.values[pos]
+        node = self.ints.get(val)
+        if node is None:
+            node = self.ints[val] = IntExpr(val)
+        return node
 
     def parse_float(self) -> Expression:
-        if self.match(TokenType.Float):
-            return FloatExpr(float(self.prev_token.lexeme))
-
-        return self.parse_string()
+        pos = self.pos
+        self.pos = pos + 1
+        return FloatExpr(self.values[pos])
 
     def parse_string(self) -> Expression:
-        if self.match(TokenType.String):
-            return StringExpr(self.prev_token.lexeme)
-
-        return self.parse_identifier()
+        pos = self.pos
+        self.pos = pos + 1
+        start = self.starts[pos]
+        return StringExpr(self.source[start:start + self.lengths[pos]])
 
     def parse_identifier(self) -> Expression:
-        if self.match(TokenType.Identifier):
-            if self.match(TokenType.Colon):
-                identifier = self.prev_token.lexeme
-                if not self.match(TokenType.Identifier):
-                    return self.unexpected_token("type")
-                type = self.prev_token.lexeme
-                return IdentifierExpr(identifier, type)
-            return IdentifierExpr(self.prev_token.lexeme)
-
-        return self.parse_var()
-
-    def parse_var(self) -> Expression:
-        if self.match(TokenType.Var):
-            lhs = self.parse_expr()
-            if not type(lhs) is IdentifierExpr:
-                return self.unexpected_token("identifier")
-            if not self.match(TokenType.Equal):
-                return self.unexpected_token("=")
-            rhs = self.parse_expr()
-            if not self.match(TokenType.Semicolon):
-                return self.unexpected_token(";")
-
-            return VarExpr(lhs, rhs)
-
-        return self.parse_const()
-
-    def parse_const(self) -> Expression:
-        if self.match(TokenType.Const):
-            lhs = self.parse_expr()
-            if not type(lhs) is IdentifierExpr:
-                return self.unexpected_token("identifier")
-            if not self.match(TokenType.Equal):
-                return self.unexpected_token("=")
-            rhs = self.parse_expr()
-            if not self.match(TokenType.Semicolon):
-                return self.unexpected_token(";")
-
-            return ConstExpr(lhs, rhs)
-
-        return self.parse_block()
+        pos = self.pos
+        self.pos = pos + 1
+        start = self.starts[pos]
+        identifier = self.source[start:start + self.lengths[pos]]
+        if self.match_one(_T_Colon):
+            if not self.match_one(_T_Identifier):
+                self.unexpected_token("type")
+            type = self.lexeme(self.pos - 1)
+            return self.identifier_expr(identifier, type)
+        return self.identifier_expr(identifier)
+
+    def identifier_expr(self, val: str, type: str | None = None) -> IdentifierExpr:
+        key = (val, type)
+        node = self.identifiers.get(key)
+        if node is None:
+            node = self.identifiers[key] = IdentifierExpr(val, type)
+        return node
+
+    def parse_var(self, _Equal: TokenType = _T_Equal, _Semicolon: TokenType = _T_Semicolon) -> Expression:
+        self.advance()
+        if not self.peek(_T_Identifier):
+            self.unexpected_token("identifier")
+        lhs = self.parse_identifier()
+        if not self.match_one(_Equal):
+            self.unexpected_token("=")
+        rhs = self.parse_expr()
+        if not self.match_one(_Semicolon):
+            self.unexpected_token(";")
+
+        return VarExpr(lhs, rhs)
+
+    def parse_const(self, _Equal: TokenType = _T_Equal, _Semicolon: TokenType = _T_Semicolon) -> Expression:
+        self.advance()
+        if not self.peek(_T_Identifier):
+            self.unexpected_token("identifier")
+        lhs = self.parse_identifier()
+        if not self.match_one(_Equal):
+            self.unexpected_token("=")
+        rhs = self.parse_expr()
+        if not self.match_one(_Semicolon):
+            self.unexpected_token(";")
+
+        return ConstExpr(lhs, rhs)
 
     def parse_block(self) -> Expression:
-        if self.match(TokenType.LeftBracket):
-            exprs = []
-            while not self.is_at_end():
-                if self.peek(TokenType.RightBracket):
-                    break
-                exprs.append(self.parse_expr())
-
-            if not self.match(TokenType.RightBracket):
-                return self.unexpected_token("}")
+        self.advance()
+        exprs: List[Expression] = []
+        types = self.types
+        type = types[self.pos]
+        while type is not _T_Eof and type is not _T_RightBracket:
+            exprs.append(self.parse_expr())
+            type = types[self.pos]
 
-            return BlockExpr(exprs)
+        if not self.match_one(_T_RightBracket):
+            self.unexpected_token("}")
 
-        return self.parse_function_expr()
+        return BlockExpr(exprs)
 
     def parse_function_expr(self) -> Expression:
-        if self.match(TokenType.Function):
-            if not self.match(TokenType.Identifier):
-                return self.unexpected_token("identifier")
-            identifier = IdentifierExpr(self.prev_token.lexeme)
-
-            if not self.match(TokenType.LeftParen):
-                return self.unexpected_token("(")
-
-            params = []
-            while not self.is_at_end():
-                if self.match(TokenType.Comma):
-                    continue
+        self.advance()
+        if not self.match_one(_T_Identifier):
+            self.unexpected_token("identifier")
+        identifier = self.identifier_expr(self.lexeme(self.pos - 1))
+
+        if not self.match_one(_T_LeftParen):
+            self.unexpected_token("(")
+
+        params: List[Expression] = []
+        types, eof, comma, right_paren = self.types, _T_Eof, _T_Comma, _T_RightParen
+        while True:
+            pos = self.pos
+            type = types[pos]
+            if type is eof or type is right_paren:
+                break
 
-                if self.peek(TokenType.RightParen):
-                    break
-                expr = self.parse_expr()
-                params.append(expr)
+            if type is comma:
+                self.pos = pos + 1
+                continue
 
-            if not self.match(TokenType.RightParen):
-                return self.unexpected_token(")")
+            expr = self.parse_expr()
+            params.append(expr)
 
-            block = self.parse_block()
+        if not self.match_one(_T_RightParen):
+            self.unexpected_token(")")
 
-            return FunctionExpr(identifier, params, block)
+        if not self.peek(_T_LeftBracket):
+            self.unexpected_token("{")
+        block = self.parse_block()
 
-        return self.parse_return_expr()
+        return FunctionExpr(identifier, params, block)
 
     def parse_return_expr(self) -> Expression:
-        if self.match(TokenType.Return):
-            expr = self.parse_expr()
-
-            if not self.match(TokenType.Semicolon):
-                return self.unexpected_token(";")
-            return ReturnExpr(expr)
-
-        return self.unexpected_token()
+        self.advance()
+        expr = self.parse_expr()
 
-    def unexpected_token(self, token_str="primary expression"):
-        raise UnexpectedToken(f"""{self.lexer.row}:{
-                              self.lexer.col} -> Expected '{token_str}' instead got '{self.curr_token.lexeme}'""")
+        if not self.match_one(_T_Semicolon):
+            self.unexpected_token(";")
+        return ReturnExpr(expr)
+
+    def unexpected_token(self, token_str: str = "primary expression") -> NoReturn:
+        end = self.starts[self.pos] + self.lengths[self.pos]
+        if self.types[self.pos] is _T_String:
+            end += 1
+        row = self.source.count("\n", 0, end)
+        col = end - (self.source.rfind("\n", 0, end) + 1)
+        raise UnexpectedToken(f"""{row}:{col} -> Expected '{token_str}' instead got '{self.lexeme(self.pos)}'""")
+
+
+PRIMARY_PARSERS: Dict[TokenType, Callable[[Parser], Expression]] = {
+    _T_Int: Parser.parse_int,
+    _T_Float: Parser.parse_float,
+    _T_String: Parser.parse_string,
+    _T_Identifier: Parser.parse_identifier,
+    _T_Var: Parser.parse_var,
+    _T_Const: Parser.parse_const,
+    _T_LeftBracket: Parser.parse_block,
+    _T_Function: Parser.parse_function_expr,
+    _T_Return: Parser.parse_return_expr,
+}